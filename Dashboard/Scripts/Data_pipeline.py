@@ -92,9 +92,10 @@ def validate_dataframe_columns(dataframe, csv_file_path):
         print("Columns are valid and match the expected structure.")
 
 # Step 2.1: Correct Data Types
-def correct_data_types(df):
+def correct_data_types(df, verbose=True):
     """
     Correct the data types for the dataset to ensure consistency.
+    Set verbose=False to silence the success message (e.g. for per-request validation).
     """
     try:
         df['Timestamp'] = pd.to_datetime(df['Timestamp'], errors='coerce', dayfirst=True)  # Convert to datetime
@@ -127,7 +128,8 @@ def correct_data_types(df):
         # Drop the original 'User Coordinates' column
         df.drop(columns=['User Coordinates'], inplace=True)
         
-        print("Data types corrected successfully.")
+        if verbose:
+            print("Data types corrected successfully.")
         return df
     
     except Exception as e:
@@ -163,7 +165,7 @@ def check_inconsistencies(df):
     
     for column in energy_columns:
         if column in df.columns:
-            df = df[df[column] >= 0]  # Ensure no negative values for these columns
+            df = df[~(df[column] < 0)]  # Ensure no negative values for these columns (missing values are filled later)
 
     return df
 
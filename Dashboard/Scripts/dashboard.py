@@ -4,12 +4,15 @@ from dash.dependencies import Input, Output
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
+import sys
+import os
 
-# Load and prepare your data
-solar_data = pd.read_csv('ETL/Clean_data/cleaned_solar_data.csv')
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-# Convert 'Timestamp' column to datetime
-solar_data['Timestamp'] = pd.to_datetime(solar_data['Timestamp'])
+from app.utils.data_processing import device_attribute, join_device_attributes, load_telemetry
+
+# Load and prepare your data (compact dtypes, datetime 'Timestamp', static device attributes in a separate table)
+solar_data, device_data = load_telemetry('ETL/Clean_data/cleaned_solar_data.csv')
 
 # Filter the data based on selected profile, panel type, and month
 def filter_data(profile, panel_type, month):
@@ -128,6 +131,9 @@ def update_graphs(selected_profile, selected_panel_type, selected_month):
     if filtered_data.empty:
         return [{} for _ in range(9)]
 
+    # Voltage is a static device attribute, join it back for the load/voltage chart
+    filtered_data = join_device_attributes(filtered_data, device_data, ['Voltage (V)'])
+
     # Group by hour
     hourly_trends = group_by_hour(filtered_data)
 
@@ -189,7 +195,7 @@ def update_graphs(selected_profile, selected_panel_type, selected_month):
                             title='Solar Panels Type Distribution')
 
     # 9. Battery technology distribution (Pie chart)
-    battery_tech_dist = solar_data['Battery Technology'].value_counts()
+    battery_tech_dist = device_attribute(solar_data, device_data, 'Battery Technology').value_counts()
     fig_battery_tech_dist = px.pie(values=battery_tech_dist.values, names=battery_tech_dist.index, 
                                    title='Battery Technology Distribution')
 
@@ -8,7 +8,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 #sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
 from app.utils.model import load_model_and_scaler, make_prediction
-from app.utils.data_processing import filter_data, group_by_hour
+from app.utils.data_processing import filter_data, group_by_hour, device_attribute, load_telemetry
 from app.utils.visualization import generate_graphs, generate_pie_chart, generate_gauge_chart
 
 # Set page configuration
@@ -17,12 +17,10 @@ st.set_page_config(page_title="PowerBox Dashboard", layout="wide")
 # Load data
 @st.cache_data
 def load_data():
-    data = pd.read_csv("ETL/Clean_data/cleaned_solar_data.csv")
-    data['Timestamp'] = pd.to_datetime(data['Timestamp'], dayfirst=True, errors='coerce')  # Parse with dayfirst=True
-    data = data.dropna(subset=['Timestamp'])  # Drop rows where parsing failed
-    return data
+    # Compact dtypes, parsed dates and static device attributes split into their own table
+    return load_telemetry("ETL/Clean_data/cleaned_solar_data.csv", dayfirst=True)
 
-solar_data = load_data()
+solar_data, device_data = load_data()
 
 # Load model and scaler
 model, scaler = load_model_and_scaler()
@@ -124,7 +122,7 @@ with tab3:
     panel_dist = solar_data['Solar Panels Type'].value_counts()
     st.plotly_chart(generate_pie_chart(panel_dist, "Solar Panels Type Distribution"), use_container_width=True)
 
-    battery_tech_dist = solar_data['Battery Technology'].value_counts()
+    battery_tech_dist = device_attribute(solar_data, device_data, 'Battery Technology').value_counts()
     st.plotly_chart(generate_pie_chart(battery_tech_dist, "Battery Technology Distribution"), use_container_width=True)
 
 
@@ -1,3 +1,7 @@
+import ctypes
+import ctypes.util
+
+import numpy as np
 import pandas as pd
 
 def filter_data(data, profile, panel_type, month):
@@ -16,3 +20,163 @@ def group_by_hour(data):
     data['Hour'] = data['Timestamp'].dt.hour
     data['Date'] = data['Timestamp'].dt.date
     return data.groupby(['Date', 'Hour']).mean(numeric_only=True).reset_index()
+
+
+# Telemetry columns grouped by how they should be stored in memory
+BOOLEAN_COLUMNS = ['System ON', 'System Fault Alerts', 'Battery Low Flag', 'Battery Full Flag']
+CATEGORY_COLUMNS = ['Customer Profile', 'Solar Panels Type', 'Solar Panels Configuration', 'Battery Technology']
+FLOAT64_COLUMNS = ['Latitude', 'Longitude']  # Coordinates need more than float32 precision
+FLOAT32_COLUMNS = ['Temperature (°C)', 'Solar Panels Energy Output (W)', 'Power Consumption (kW)',
+                   'Energy Stored in Batteries (kWh)', 'Inverter Efficiency (%)', 'System Load (kW)',
+                   'Voltage (V)', 'Current (A)', 'Power Factor', 'Dust and Dirt Accumulation (g/m²)',
+                   'Depth of Discharge', 'Battery Capacity (Wh)', 'Inverter Capacity (kW)']
+
+# Attributes that are fixed for a given installation and only needed on demand
+STATIC_DEVICE_COLUMNS = ['Voltage (V)', 'Power Factor', 'Battery Capacity (Wh)',
+                         'Inverter Capacity (kW)', 'Battery Technology']
+DEVICE_KEY = 'Device Key'
+
+
+def memory_usage_mb(data):
+    """
+    Return the deep memory usage of a DataFrame in megabytes.
+    """
+    return data.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def read_telemetry_csv(csv_path, dayfirst=False, chunksize=50000):
+    """
+    Read cleaned telemetry with compact dtypes applied by the parser, so the wide
+    float64/object frame is never built. Reading in chunks keeps the parser's
+    temporary string objects (e.g. raw timestamps) to one chunk at a time;
+    unparseable timestamps become NaT. Columns missing from the file are ignored.
+    """
+    dtypes = {column: 'boolean' for column in BOOLEAN_COLUMNS}
+    dtypes.update({column: 'category' for column in CATEGORY_COLUMNS})
+    dtypes.update({column: 'float32' for column in FLOAT32_COLUMNS})
+    dtypes.update({column: 'float64' for column in FLOAT64_COLUMNS})
+    chunks = []
+    for chunk in pd.read_csv(csv_path, dtype=dtypes, chunksize=chunksize):
+        chunk['Timestamp'] = pd.to_datetime(chunk['Timestamp'], dayfirst=dayfirst, errors='coerce')
+        chunks.append(chunk)
+    data = pd.concat(chunks, ignore_index=True)
+    for column in CATEGORY_COLUMNS:
+        if column in data.columns:
+            data[column] = data[column].astype('category')  # Chunks may have different categories
+    return data
+
+
+def downcast_dtypes(data, float_rtol=1e-6):
+    """
+    Shrink column dtypes where precision allows: integral floats become the smallest
+    integer type, other floats become float32 when the round trip stays within
+    float_rtol, flags become nullable booleans and labels become categoricals.
+    """
+    data = data.copy(deep=False)  # Columns are replaced, not modified, so the input is left intact
+    for column in data.columns:
+        series = data[column]
+        if column in BOOLEAN_COLUMNS:
+            data[column] = series.astype('boolean')
+        elif column in CATEGORY_COLUMNS:
+            data[column] = series.astype('category')
+        elif column in FLOAT64_COLUMNS or not pd.api.types.is_numeric_dtype(series) \
+                or pd.api.types.is_bool_dtype(series):
+            continue
+        elif series.notna().all() and (series % 1 == 0).all():
+            data[column] = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_float_dtype(series):
+            as_float32 = series.astype('float32')
+            if np.allclose(series, as_float32.astype('float64'), rtol=float_rtol, atol=0, equal_nan=True):
+                data[column] = as_float32
+    return data
+
+
+def split_device_attributes(data, columns=STATIC_DEVICE_COLUMNS):
+    """
+    Move per-device static attributes into a dimension table keyed by DEVICE_KEY.
+    Returns (facts, devices); use join_device_attributes to bring columns back.
+    """
+    columns = [column for column in columns if column in data.columns]
+    if not columns:
+        return data, pd.DataFrame(index=pd.Index([], name=DEVICE_KEY))
+
+    keys = data.groupby(columns, sort=False, dropna=False, observed=True).ngroup()
+    devices = data[columns].assign(**{DEVICE_KEY: keys.values}).drop_duplicates(DEVICE_KEY)
+    devices = devices.set_index(DEVICE_KEY).sort_index()
+
+    facts = data.drop(columns=columns)
+    facts[DEVICE_KEY] = pd.to_numeric(keys, downcast='integer')
+    return facts, devices
+
+
+def device_attribute(facts, devices, column):
+    """
+    Look up one static device attribute per fact row, without copying the facts.
+    """
+    return facts[DEVICE_KEY].map(devices[column])
+
+
+def join_device_attributes(facts, devices, columns=None):
+    """
+    Attach static device attributes (all of them, or only the requested columns) to the facts.
+    Only the new columns are allocated; the fact columns are shared with the input.
+    """
+    columns = list(devices.columns) if columns is None else columns
+    joined = facts.copy(deep=False)
+    for column in columns:
+        joined[column] = device_attribute(facts, devices, column)
+    return joined
+
+
+def release_free_memory():
+    """
+    Hand freed heap pages back to the OS. glibc keeps the memory released by the
+    parser's temporary objects mapped to the process, so without this the worker's
+    RSS stays close to the load peak. Does nothing on platforms without malloc_trim.
+    """
+    libc_path = ctypes.util.find_library('c')
+    if libc_path is None:
+        return
+    malloc_trim = getattr(ctypes.CDLL(libc_path), 'malloc_trim', None)
+    if malloc_trim is not None:
+        malloc_trim(0)
+
+
+def compact_telemetry(data):
+    """
+    Downcast the cleaned telemetry and split out static device attributes.
+    Returns (facts, devices).
+    """
+    return split_device_attributes(downcast_dtypes(data))
+
+
+def load_telemetry(csv_path, dayfirst=False):
+    """
+    Load cleaned telemetry as compact (facts, devices), dropping rows whose timestamp
+    could not be parsed. The intermediate frames are gone by the time free memory is
+    released, so the worker only keeps the compact tables resident.
+    """
+    data = read_telemetry_csv(csv_path, dayfirst=dayfirst)
+    if data['Timestamp'].isna().any():
+        data = data.dropna(subset=['Timestamp'])
+    facts, devices = compact_telemetry(data)
+    del data
+    release_free_memory()
+    return facts, devices
+
+
+def memory_reduction_report(csv_path, dayfirst=False):
+    """
+    Compare the in-memory size of a telemetry CSV loaded with default dtypes against
+    the compact (facts, devices) representation. Prints and returns the reduction factor.
+    """
+    baseline = pd.read_csv(csv_path)
+    baseline['Timestamp'] = pd.to_datetime(baseline['Timestamp'], dayfirst=dayfirst, errors='coerce')
+    before = memory_usage_mb(baseline)
+    del baseline
+
+    facts, devices = load_telemetry(csv_path, dayfirst=dayfirst)
+    after = memory_usage_mb(facts) + memory_usage_mb(devices)
+    reduction = before / after if after else float('inf')
+    print(f"Telemetry compacted from {before:.2f} MB to {after:.2f} MB ({reduction:.1f}x smaller)")
+    return reduction
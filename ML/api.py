@@ -1,10 +1,45 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Response
 from pydantic import BaseModel
 import pandas as pd
 from .ML import PowerConsumptionPredictor
-from typing import List
+from .anomaly import AnomalyDetector, DEVICE_COLUMN
+from .geo import SiteIndex, SiteRegistry
+from .ingest import TelemetryBuffer, validate_readings
+from .metrics import MetricsMiddleware, ANOMALY_DETECTION_ERRORS, ANOMALY_EVENTS, INGEST_READINGS, PREDICT_BATCH_SIZE, metrics_payload, phase_timer
+from typing import Any, Dict, List, Optional, Union
 
-app = FastAPI(title="PowerBox Prediction API")
+# Buffer for pushed telemetry, flushed to SQLite in the background
+INGEST_DB_PATH = "Data/Clean_data/solar_system.db"
+INGEST_TABLE_NAME = "ingested_solar_data"
+ingest_buffer = TelemetryBuffer(INGEST_DB_PATH, INGEST_TABLE_NAME)
+
+# Persistent site IDs, shared by the map index and the anomaly detector
+SITE_TABLE_NAME = "sites"
+try:
+    site_registry = SiteRegistry(INGEST_DB_PATH, SITE_TABLE_NAME)
+except Exception as e:
+    print(f"Error loading site registry: {str(e)}")
+    site_registry = None
+
+# Streaming anomaly detection over ingested readings, events are buffered like telemetry
+ANOMALY_TABLE_NAME = "anomaly_events"
+anomaly_detector = AnomalyDetector()
+detection_lock = threading.Lock()
+anomaly_buffer = TelemetryBuffer(INGEST_DB_PATH, ANOMALY_TABLE_NAME, flush_rows=1000)
+
+@asynccontextmanager
+async def lifespan(app):
+    await ingest_buffer.start()
+    await anomaly_buffer.start()
+    yield
+    await ingest_buffer.stop()
+    await anomaly_buffer.stop()
+
+app = FastAPI(title="PowerBox Prediction API", lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
 
 # Initialize the predictor and load the model
 try:
@@ -15,6 +50,14 @@ except Exception as e:
     # Initialize predictor without loading model for development
     predictor = PowerConsumptionPredictor()
 
+# Build the site index used by the map endpoints
+SITE_DATA_PATH = "Data/Clean_data/cleaned_solar_data.csv"
+try:
+    site_index = SiteIndex.from_csv(SITE_DATA_PATH, registry=site_registry)
+except Exception as e:
+    print(f"Error building site index: {str(e)}")
+    site_index = None
+
 class PredictionInput(BaseModel):
     temperature: float
     solar_output: float
@@ -29,34 +72,117 @@ class PredictionInput(BaseModel):
 class PredictionResponse(BaseModel):
     predicted_consumption: float
 
+class IngestResponse(BaseModel):
+    accepted: int
+    rejected: int
+
 @app.post("/predict", response_model=PredictionResponse)
 async def predict_consumption(input_data: PredictionInput):
     try:
         # Convert input data to DataFrame
-        df = pd.DataFrame([{
-            'Temperature (°C)': input_data.temperature,
-            'Solar Panels Energy Output (W)': input_data.solar_output,
-            'Energy Stored in Batteries (kWh)': input_data.battery_energy,
-            'System Load (kW)': input_data.system_load,
-            'Hour': input_data.hour,
-            'Day': input_data.day,
-            'Month': input_data.month,
-            'DayOfWeek': input_data.day_of_week,
-            'IsWeekend': input_data.is_weekend
-        }])
+        with phase_timer("build_features"):
+            df = pd.DataFrame([{
+                'Temperature (°C)': input_data.temperature,
+                'Solar Panels Energy Output (W)': input_data.solar_output,
+                'Energy Stored in Batteries (kWh)': input_data.battery_energy,
+                'System Load (kW)': input_data.system_load,
+                'Hour': input_data.hour,
+                'Day': input_data.day,
+                'Month': input_data.month,
+                'DayOfWeek': input_data.day_of_week,
+                'IsWeekend': input_data.is_weekend
+            }])
         
-        # Make prediction
-        prediction = predictor.predict(df)
+        # Make prediction (scaling happens inside the predictor and is timed as part of model_predict)
+        PREDICT_BATCH_SIZE.observe(len(df))
+        with phase_timer("model_predict"):
+            prediction = predictor.predict(df)
         
         return PredictionResponse(predicted_consumption=float(prediction[0]))
     
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.post("/ingest", response_model=IngestResponse, status_code=202)
+async def ingest_telemetry(readings: Union[List[Dict[str, Any]], Dict[str, Any]]):
+    if isinstance(readings, dict):
+        readings = [readings]
+    if not readings:
+        raise HTTPException(status_code=400, detail="No readings provided")
+
+    # Validate off the event loop so large batches don't stall other requests
+    try:
+        df, rejected = await asyncio.get_running_loop().run_in_executor(None, validate_readings, readings)
+    except ValueError as e:
+        INGEST_READINGS.labels(result="invalid").inc(len(readings))
+        raise HTTPException(status_code=422, detail=str(e))
+
+    if not ingest_buffer.put(df):
+        INGEST_READINGS.labels(result="throttled").inc(len(readings))
+        raise HTTPException(status_code=503, detail="Ingest buffer is full, retry later",
+                            headers={"Retry-After": "1"})
+
+    INGEST_READINGS.labels(result="accepted").inc(len(df))
+    INGEST_READINGS.labels(result="rejected").inc(rejected)
+
+    # Detection also runs off the event loop. The readings are already buffered, so a
+    # detection failure is logged and counted rather than failing the request
+    if site_registry is not None and not df.empty:
+        try:
+            events = await asyncio.get_running_loop().run_in_executor(None, detect_anomalies, df)
+            record_anomaly_events(events)
+        except Exception as e:
+            ANOMALY_DETECTION_ERRORS.inc()
+            print(f"Anomaly detection failed for {len(df)} readings: {e}")
+    return IngestResponse(accepted=len(df), rejected=rejected)
+
+def detect_anomalies(df):
+    # Runs in a worker thread; the lock keeps registry and detector updates serial.
+    # Readings are keyed by persistent site ID, and unseen sites are registered on the fly
+    with detection_lock:
+        df = df.assign(**{DEVICE_COLUMN: site_registry.resolve(df['Latitude'], df['Longitude'])})
+        return anomaly_detector.update(df[df[DEVICE_COLUMN] >= 0])  # -1 marks unusable coordinates
+
+def record_anomaly_events(events):
+    if events.empty:
+        return
+    for event, count in events['Event'].value_counts().items():
+        ANOMALY_EVENTS.labels(event=event).inc(count)
+    if not anomaly_buffer.put(events):
+        print(f"Anomaly buffer full, dropped {len(events)} events")
+
 @app.get("/model-info")
 async def get_model_info():
     return {
         "features": predictor.features,
         "model_type": "Random Forest Regressor",
         "version": "1.0"
-    } 
\ No newline at end of file
+    }
+
+@app.get("/metrics")
+async def get_metrics():
+    payload, content_type = metrics_payload()
+    return Response(content=payload, media_type=content_type)
+
+def get_site_index():
+    if site_index is None:
+        raise HTTPException(status_code=503, detail="Site index is not available")
+    return site_index
+
+def to_records(df):
+    return df.reset_index().to_dict(orient="records")
+
+@app.get("/sites")
+async def get_sites_in_bbox(min_lat: float, min_lon: float, max_lat: float, max_lon: float):
+    return to_records(get_site_index().within_bbox(min_lat, min_lon, max_lat, max_lon))
+
+@app.get("/sites/nearest")
+async def get_nearest_sites(lat: float, lon: float, k: int = 1):
+    if k < 1:
+        raise HTTPException(status_code=400, detail="k must be at least 1")
+    return to_records(get_site_index().nearest(lat, lon, k))
+
+@app.get("/sites/clusters")
+async def get_site_clusters(zoom: int, min_lat: Optional[float] = None, min_lon: Optional[float] = None,
+                            max_lat: Optional[float] = None, max_lon: Optional[float] = None):
+    return to_records(get_site_index().clusters(zoom, min_lat, min_lon, max_lat, max_lon))
@@ -0,0 +1,288 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_KM = 6371.0088
+MAX_MERCATOR_LAT = 85.05112878
+# Readings from one unit drift by up to ~160 m, so 250 m keeps each unit on one site
+# while neighbouring installations a few hundred metres apart stay separate
+SITE_RADIUS_KM = 0.25
+
+SITE_ID = 'Site ID'
+OUTPUT_COLUMN = 'Solar Panels Energy Output (W)'
+FAULT_COLUMN = 'System Fault Alerts'
+
+
+def to_unit_vectors(lat, lon):
+    """
+    Project latitude/longitude (degrees) onto the unit sphere so that euclidean
+    distance in the KD-tree is monotonic with great-circle distance.
+    """
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lon = np.radians(np.asarray(lon, dtype=float))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+def km_to_chord(distance_km):
+    return 2 * np.sin(np.asarray(distance_km) / (2 * EARTH_RADIUS_KM))
+
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2, 0, 1))
+
+
+def tile_coordinates(lat, lon, zoom):
+    """
+    Web Mercator (slippy map) tile x/y for each coordinate at the given zoom level.
+    """
+    n = 2 ** zoom
+    lat = np.radians(np.clip(np.asarray(lat, dtype=float), -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+    x = np.floor((np.asarray(lon, dtype=float) + 180.0) / 360.0 * n)
+    y = np.floor((1.0 - np.arcsinh(np.tan(lat)) / np.pi) / 2.0 * n)
+    return np.clip(x, 0, n - 1).astype(np.int64), np.clip(y, 0, n - 1).astype(np.int64)
+
+
+def snap_coordinates(lat, lon, radius_km=SITE_RADIUS_KM):
+    """
+    Snap drifting per-reading coordinates to canonical sites.
+
+    Unique coordinates are visited from most to least frequent; each unassigned
+    coordinate starts a new site that absorbs every unassigned coordinate within
+    radius_km. Returns a site id per input coordinate, or -1 where it is missing or
+    not finite.
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    valid = np.isfinite(lat) & np.isfinite(lon)
+    site_ids = np.full(len(lat), -1, dtype=np.int64)
+    if not valid.any():
+        return site_ids
+
+    coords = pd.DataFrame({'Latitude': lat[valid], 'Longitude': lon[valid]})
+    unique = coords.value_counts(sort=True).reset_index(name='Readings')
+
+    xyz = to_unit_vectors(unique['Latitude'], unique['Longitude'])
+    tree = cKDTree(xyz)
+    chord = km_to_chord(radius_km)
+
+    site_of_unique = np.full(len(unique), -1, dtype=np.int64)
+    next_site = 0
+    for i in range(len(unique)):
+        if site_of_unique[i] >= 0:
+            continue
+        members = np.asarray(tree.query_ball_point(xyz[i], chord), dtype=np.int64)
+        members = members[site_of_unique[members] < 0]
+        site_of_unique[members] = next_site
+        next_site += 1
+
+    lookup = pd.Series(site_of_unique, index=pd.MultiIndex.from_frame(unique[['Latitude', 'Longitude']]))
+    site_ids[valid] = lookup.reindex(pd.MultiIndex.from_frame(coords)).to_numpy()
+    return site_ids
+
+
+class SiteRegistry:
+    """
+    Persistent canonical site IDs backed by a SQLite table.
+
+    Coordinates within radius_km of a registered site resolve to its ID. Anything
+    further away is snapped into new sites (see snap_coordinates), which are appended
+    to the table. IDs never change once assigned, and new units are registered
+    the first time they report.
+    """
+
+    def __init__(self, db_path, table_name='sites', radius_km=SITE_RADIUS_KM):
+        self.db_path = db_path
+        self.table_name = table_name
+        self.radius_km = radius_km
+
+        conn = sqlite3.connect(db_path)
+        try:
+            with conn:
+                conn.execute(f'CREATE TABLE IF NOT EXISTS "{table_name}" '
+                             f'("{SITE_ID}" INTEGER PRIMARY KEY, "Latitude" REAL, "Longitude" REAL)')
+                rows = conn.execute(f'SELECT "{SITE_ID}", "Latitude", "Longitude" FROM "{table_name}"').fetchall()
+        finally:
+            conn.close()
+
+        sites = np.array(rows, dtype=float).reshape(-1, 3)
+        self._set_sites(sites[:, 0].astype(np.int64), sites[:, 1], sites[:, 2])
+
+    def _set_sites(self, ids, latitudes, longitudes):
+        self._ids, self._latitudes, self._longitudes = ids, latitudes, longitudes
+        self._tree = cKDTree(to_unit_vectors(latitudes, longitudes)) if len(ids) else None
+
+    @property
+    def sites(self):
+        return pd.DataFrame({'Latitude': self._latitudes, 'Longitude': self._longitudes},
+                            index=pd.Index(self._ids, name=SITE_ID))
+
+    def resolve(self, lat, lon):
+        """
+        Return the site ID for each coordinate, registering new sites for unmatched ones.
+        Missing or non-finite coordinates get -1 and are never registered.
+        """
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        valid = np.isfinite(lat) & np.isfinite(lon)
+        site_ids = np.full(len(lat), -1, dtype=np.int64)
+        if self._tree is not None and valid.any():
+            distances, positions = self._tree.query(to_unit_vectors(lat[valid], lon[valid]), k=1,
+                                                    distance_upper_bound=km_to_chord(self.radius_km))
+            found = np.isfinite(distances)
+            site_ids[np.flatnonzero(valid)[found]] = self._ids[positions[found]]
+
+        unmatched = valid & (site_ids < 0)
+        if unmatched.any():
+            # New sites are centred on the mean of the coordinates that created them
+            local_ids = snap_coordinates(lat[unmatched], lon[unmatched], self.radius_km)
+            new_sites = pd.DataFrame({'Latitude': lat[unmatched], 'Longitude': lon[unmatched]}).groupby(local_ids).mean()
+            first_id = int(self._ids.max()) + 1 if len(self._ids) else 0
+            new_ids = first_id + new_sites.index.to_numpy(dtype=np.int64)
+
+            conn = sqlite3.connect(self.db_path)
+            try:
+                with conn:
+                    conn.executemany(f'INSERT INTO "{self.table_name}" VALUES (?, ?, ?)',
+                                     zip(new_ids.tolist(), new_sites['Latitude'].tolist(),
+                                         new_sites['Longitude'].tolist()))
+            finally:
+                conn.close()
+
+            site_ids[unmatched] = first_id + local_ids
+            self._set_sites(np.concatenate([self._ids, new_ids]),
+                            np.concatenate([self._latitudes, new_sites['Latitude'].to_numpy()]),
+                            np.concatenate([self._longitudes, new_sites['Longitude'].to_numpy()]))
+        return site_ids
+
+
+class SiteIndex:
+    """
+    Spatial index over canonical Powerbox sites with pre-aggregated map clusters.
+
+    Sites are stored sorted by latitude for bounding-box lookups, a KD-tree on
+    unit-sphere vectors answers nearest-site queries, and per-zoom tile clusters
+    (site/reading counts, mean output and fault rate) are computed once at build time.
+    """
+
+    def __init__(self, sites, radius_km=SITE_RADIUS_KM, max_zoom=18):
+        self.radius_km = radius_km
+        self.max_zoom = max_zoom
+        self.sites = sites.sort_values('Latitude')
+        self._latitudes = self.sites['Latitude'].to_numpy()
+        self._longitudes = self.sites['Longitude'].to_numpy()
+        self._tree = cKDTree(to_unit_vectors(self._latitudes, self._longitudes))
+        self._clusters = {zoom: self._aggregate_zoom(zoom) for zoom in range(max_zoom + 1)}
+
+    @classmethod
+    def from_readings(cls, df, radius_km=SITE_RADIUS_KM, max_zoom=18, registry=None):
+        """
+        Build the index from cleaned telemetry with per-reading Latitude/Longitude.
+        With a SiteRegistry the sites carry its persistent IDs; without one they are
+        numbered by snap_coordinates and only stable for this build.
+        """
+        df = df.dropna(subset=['Latitude', 'Longitude'])
+        if registry is not None:
+            site_ids = registry.resolve(df['Latitude'], df['Longitude'])
+        else:
+            site_ids = snap_coordinates(df['Latitude'], df['Longitude'], radius_km)
+
+        readings = pd.DataFrame({
+            SITE_ID: site_ids,
+            'Latitude': df['Latitude'].to_numpy(dtype=float),
+            'Longitude': df['Longitude'].to_numpy(dtype=float),
+            'Output Sum': df[OUTPUT_COLUMN].to_numpy(dtype=float),
+            'Faults': df[FAULT_COLUMN].fillna(False).to_numpy(dtype=bool),
+        })
+        sites = readings.groupby(SITE_ID).agg(
+            Latitude=('Latitude', 'mean'),
+            Longitude=('Longitude', 'mean'),
+            Readings=('Latitude', 'size'),
+            **{'Output Sum': ('Output Sum', 'sum'), 'Faults': ('Faults', 'sum')},
+        )
+        return cls(sites, radius_km=radius_km, max_zoom=max_zoom)
+
+    @classmethod
+    def from_csv(cls, csv_path, radius_km=SITE_RADIUS_KM, max_zoom=18, registry=None):
+        """
+        Build the index from a cleaned telemetry CSV, reading only the columns it needs.
+        """
+        usecols = ['Latitude', 'Longitude', OUTPUT_COLUMN, FAULT_COLUMN]
+        return cls.from_readings(pd.read_csv(csv_path, usecols=usecols), radius_km, max_zoom, registry)
+
+    def _aggregate_zoom(self, zoom):
+        x, y = tile_coordinates(self._latitudes, self._longitudes, zoom)
+        weights = self.sites['Readings'].to_numpy()
+        tiles = pd.DataFrame({
+            'x': x,
+            'y': y,
+            'Sites': 1,
+            'Readings': weights,
+            'Output Sum': self.sites['Output Sum'].to_numpy(),
+            'Faults': self.sites['Faults'].to_numpy(),
+            'Weighted Latitude': self._latitudes * weights,
+            'Weighted Longitude': self._longitudes * weights,
+        }).groupby(['x', 'y']).sum()
+
+        return pd.DataFrame({
+            'Latitude': tiles['Weighted Latitude'] / tiles['Readings'],
+            'Longitude': tiles['Weighted Longitude'] / tiles['Readings'],
+            'Sites': tiles['Sites'],
+            'Readings': tiles['Readings'],
+            'Mean Output (W)': tiles['Output Sum'] / tiles['Readings'],
+            'Fault Rate': tiles['Faults'] / tiles['Readings'],
+        })
+
+    def _summary(self, sites):
+        return pd.DataFrame({
+            'Latitude': sites['Latitude'],
+            'Longitude': sites['Longitude'],
+            'Readings': sites['Readings'],
+            'Mean Output (W)': sites['Output Sum'] / sites['Readings'],
+            'Fault Rate': sites['Faults'] / sites['Readings'],
+        })
+
+    def assign(self, lat, lon):
+        """
+        Map reading coordinates to the nearest known site id, or -1 when no site is within radius_km.
+        """
+        distances, positions = self._tree.query(to_unit_vectors(lat, lon), k=1,
+                                                distance_upper_bound=km_to_chord(self.radius_km))
+        found = np.isfinite(distances)
+        site_ids = np.full(len(positions), -1, dtype=np.int64)
+        site_ids[found] = self.sites.index.to_numpy()[positions[found]]
+        return site_ids
+
+    def nearest(self, lat, lon, k=1):
+        """
+        Return the k nearest sites to a point with their great-circle distance in km.
+        """
+        k = min(k, len(self.sites))
+        distances, positions = self._tree.query(to_unit_vectors([lat], [lon])[0], k=k)
+        positions = np.atleast_1d(positions)
+        result = self._summary(self.sites.iloc[positions])
+        result['Distance (km)'] = chord_to_km(np.atleast_1d(distances))
+        return result
+
+    def within_bbox(self, min_lat, min_lon, max_lat, max_lon):
+        """
+        Return the sites inside a latitude/longitude bounding box.
+        """
+        start = np.searchsorted(self._latitudes, min_lat, side='left')
+        stop = np.searchsorted(self._latitudes, max_lat, side='right')
+        longitudes = self._longitudes[start:stop]
+        mask = (longitudes >= min_lon) & (longitudes <= max_lon)
+        return self._summary(self.sites.iloc[start:stop][mask])
+
+    def clusters(self, zoom, min_lat=None, min_lon=None, max_lat=None, max_lon=None):
+        """
+        Return the pre-aggregated tile clusters for a zoom level, optionally limited to a bounding box.
+        """
+        clusters = self._clusters[int(np.clip(zoom, 0, self.max_zoom))]
+        if None in (min_lat, min_lon, max_lat, max_lon):
+            return clusters
+        mask = (clusters['Latitude'].between(min_lat, max_lat)
+                & clusters['Longitude'].between(min_lon, max_lon))
+        return clusters[mask]
@@ -0,0 +1,199 @@
+import asyncio
+import os
+import sqlite3
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Dashboard', 'Scripts')))
+
+from Data_pipeline import correct_data_types, check_inconsistencies
+from .metrics import INGEST_BUFFER_ROWS, INGEST_FLUSH_LATENCY, INGEST_FLUSH_ROWS
+
+# Raw telemetry fields a pushed reading must carry (same schema as the file drops)
+TELEMETRY_COLUMNS = [
+    'Timestamp', 'System ON', 'Temperature (°C)', 'Solar Panels Energy Output (W)',
+    'Power Consumption (kW)', 'Energy Stored in Batteries (kWh)', 'Inverter Efficiency (%)',
+    'System Load (kW)', 'System Fault Alerts', 'Voltage (V)', 'Current (A)', 'Power Factor',
+    'Dust and Dirt Accumulation (g/m²)', 'Battery Low Flag', 'Battery Full Flag',
+    'Customer Profile', 'User Coordinates', 'Solar Panels Type', 'Solar Panels Configuration',
+    'Depth of Discharge', 'Battery Capacity (Wh)', 'Inverter Capacity (kW)', 'Battery Technology',
+]
+
+FLAG_COLUMNS = ['System ON', 'System Fault Alerts', 'Battery Low Flag', 'Battery Full Flag']
+FLAG_VALUES = {'true': True, 'false': False, '1': True, '0': False}
+# Fields correct_data_types casts with astype(float); missing values are allowed
+NUMERIC_COLUMNS = [
+    'Temperature (°C)', 'Solar Panels Energy Output (W)', 'Power Consumption (kW)',
+    'Energy Stored in Batteries (kWh)', 'Inverter Efficiency (%)', 'System Load (kW)', 'Voltage (V)',
+    'Current (A)', 'Power Factor', 'Dust and Dirt Accumulation (g/m²)', 'Battery Capacity (Wh)',
+    'Inverter Capacity (kW)',
+]
+
+
+def parse_flag(value):
+    """
+    Parse a pushed flag value, returning None if it isn't a recognised true/false.
+    correct_data_types uses astype(bool), which turns any non-empty string (including
+    "FALSE") and missing values into True, so flags are normalised here first.
+    """
+    if isinstance(value, str):
+        return FLAG_VALUES.get(value.strip().lower())
+    if isinstance(value, (bool, int, float)) and value in (0, 1):
+        return bool(value)
+    return None
+
+
+def _invalid_numbers(values):
+    """
+    Mask of values that are present but can't be read as a number.
+    """
+    return pd.to_numeric(values, errors='coerce').isna() & values.notna()
+
+
+def _invalid_rows(df):
+    """
+    Mask of readings that correct_data_types can't type, or whose timestamp or
+    coordinates are unusable. Each check runs once over the whole batch.
+    """
+    invalid = pd.to_datetime(df['Timestamp'], errors='coerce', dayfirst=True).isna()
+
+    for column in FLAG_COLUMNS:
+        invalid |= df[column].map(parse_flag).isna()
+    for column in NUMERIC_COLUMNS:
+        invalid |= _invalid_numbers(df[column])
+
+    # Depth of Discharge is a percentage string such as "80%"
+    depth = df['Depth of Discharge']
+    is_text = depth.map(lambda value: isinstance(value, str))
+    invalid |= depth.notna() & ~is_text
+    invalid |= _invalid_numbers(depth.where(is_text, '0').astype(str).str.rstrip('%'))
+
+    # Coordinates are a "latitude,longitude" string inside the globe's bounds
+    parts = df['User Coordinates'].astype(str).str.split(',')
+    invalid |= parts.str.len() != 2
+    latitude = pd.to_numeric(parts.str[0], errors='coerce')
+    longitude = pd.to_numeric(parts.str[1], errors='coerce')
+    invalid |= ~(latitude.between(-90, 90) & longitude.between(-180, 180))
+    return invalid
+
+
+def validate_readings(readings):
+    """
+    Type and validate raw readings with the same rules as the file pipeline.
+    Returns the valid rows as a DataFrame and the number of rejected readings.
+
+    Each reading is judged on its own: one that is missing a field, can't be typed
+    or has an unusable timestamp or coordinates is rejected without affecting the
+    rest of the batch. Raises ValueError only when no reading is valid.
+    """
+    complete = [all(column in reading for column in TELEMETRY_COLUMNS) for reading in readings]
+    df = pd.DataFrame([reading for reading, ok in zip(readings, complete) if ok], columns=TELEMETRY_COLUMNS)
+    df = df[~_invalid_rows(df)].reset_index(drop=True)
+    if df.empty:
+        raise ValueError(f"No valid readings: {len(readings) - sum(complete)} missing fields, "
+                         f"{sum(complete)} with invalid values")
+
+    for column in FLAG_COLUMNS:
+        df[column] = df[column].map(parse_flag).astype(bool)
+    df = correct_data_types(df, verbose=False)
+    df = check_inconsistencies(df)
+    return df, len(readings) - len(df)
+
+
+class TelemetryBuffer:
+    """
+    In-memory buffer of rows (readings or anomaly events) flushed to one SQLite table
+    by a background task. Buffer and flush metrics are labelled by table_name.
+
+    A flush is triggered once flush_rows readings are waiting or every flush_interval
+    seconds, and each flush writes everything waiting in a single transaction. Rows
+    count against max_rows until they are committed, so put() refuses new readings
+    (backpressure) while SQLite is behind.
+    """
+
+    def __init__(self, db_path, table_name, max_rows=100000, flush_rows=10000, flush_interval=2.0):
+        self.db_path = db_path
+        self.table_name = table_name
+        self.max_rows = max_rows
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self._batches = []
+        self._rows = 0
+        self._flush_event = None
+        self._task = None
+        self._stopping = False
+
+    @property
+    def rows(self):
+        return self._rows
+
+    def put(self, df):
+        """
+        Queue validated readings. Returns False if the buffer has no room for them.
+        """
+        if self._rows + len(df) > self.max_rows:
+            return False
+        self._batches.append(df)
+        self._rows += len(df)
+        INGEST_BUFFER_ROWS.labels(table=self.table_name).set(self._rows)
+        if self._rows >= self.flush_rows and self._flush_event is not None:
+            self._flush_event.set()
+        return True
+
+    async def start(self):
+        self._stopping = False
+        self._flush_event = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop the background task after a final flush.
+        """
+        self._stopping = True
+        self._flush_event.set()
+        await self._task
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._flush_event.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_event.clear()
+            await self.flush()
+        # Rows queued while the last flush was writing
+        await self.flush()
+
+    async def flush(self):
+        """
+        Write all queued readings to SQLite. Returns the number of rows written.
+        """
+        if not self._batches:
+            return 0
+
+        batches, self._batches = self._batches, []
+        df = pd.concat(batches, ignore_index=True)
+        start = time.perf_counter()
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._write, df)
+        except Exception as e:
+            # Keep the rows queued (and counted) so they are retried on the next flush
+            print(f"Failed to flush telemetry buffer: {e}")
+            self._batches = batches + self._batches
+            return 0
+
+        self._rows -= len(df)
+        INGEST_BUFFER_ROWS.labels(table=self.table_name).set(self._rows)
+        INGEST_FLUSH_LATENCY.labels(table=self.table_name).observe(time.perf_counter() - start)
+        INGEST_FLUSH_ROWS.labels(table=self.table_name).observe(len(df))
+        return len(df)
+
+    def _write(self, df):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                df.to_sql(self.table_name, conn, if_exists='append', index=False)
+        finally:
+            conn.close()
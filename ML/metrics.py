@@ -0,0 +1,135 @@
+import time
+from contextlib import contextmanager
+
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+
+# Request-level metrics, labelled by route template (not raw path) to keep cardinality bounded
+REQUEST_COUNT = Counter(
+    "powerbox_api_requests_total",
+    "Total HTTP requests handled by the prediction API",
+    ["method", "route", "status"],
+)
+REQUEST_ERRORS = Counter(
+    "powerbox_api_request_errors_total",
+    "HTTP requests that ended with a 4xx/5xx status or an unhandled exception",
+    ["method", "route", "status"],
+)
+REQUEST_LATENCY = Histogram(
+    "powerbox_api_request_duration_seconds",
+    "End-to-end request latency",
+    ["method", "route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "powerbox_api_requests_in_flight",
+    "Requests currently being processed",
+)
+
+# Inner-phase metrics for the prediction path
+PHASE_LATENCY = Histogram(
+    "powerbox_predict_phase_duration_seconds",
+    "Time spent in each phase of a prediction",
+    ["phase"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+PREDICT_BATCH_SIZE = Histogram(
+    "powerbox_predict_batch_size",
+    "Number of rows passed to the model per prediction call",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+
+# Telemetry ingest metrics
+INGEST_READINGS = Counter(
+    "powerbox_ingest_readings_total",
+    "Telemetry readings received by the ingest endpoint",
+    ["result"],
+)
+INGEST_BUFFER_ROWS = Gauge(
+    "powerbox_ingest_buffer_rows",
+    "Buffered rows waiting to be committed to SQLite, per target table",
+    ["table"],
+)
+INGEST_FLUSH_LATENCY = Histogram(
+    "powerbox_ingest_flush_duration_seconds",
+    "Time taken to write one buffered batch to SQLite",
+    ["table"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+INGEST_FLUSH_ROWS = Histogram(
+    "powerbox_ingest_flush_rows",
+    "Number of rows written per flush",
+    ["table"],
+    buckets=(10, 100, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000),
+)
+
+ANOMALY_EVENTS = Counter(
+    "powerbox_anomaly_events_total",
+    "Anomaly events emitted by the streaming detector",
+    ["event"],
+)
+ANOMALY_DETECTION_ERRORS = Counter(
+    "powerbox_anomaly_detection_errors_total",
+    "Ingest batches whose anomaly detection failed after the readings were buffered",
+)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+@contextmanager
+def phase_timer(phase):
+    """
+    Record the duration of a block under the given prediction phase.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        PHASE_LATENCY.labels(phase=phase).observe(time.perf_counter() - start)
+
+
+def metrics_payload():
+    """
+    Render all registered metrics in the Prometheus text format.
+    """
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware that records request counts, errors, latency and in-flight requests.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            REQUESTS_IN_FLIGHT.dec()
+
+            # The router stores the matched route in the scope once the request has been dispatched
+            route = scope.get("route")
+            route_path = getattr(route, "path", UNMATCHED_ROUTE)
+            method = scope.get("method", "")
+            status = str(status_code)
+
+            REQUEST_COUNT.labels(method=method, route=route_path, status=status).inc()
+            REQUEST_LATENCY.labels(method=method, route=route_path).observe(elapsed)
+            if status_code >= 400:
+                REQUEST_ERRORS.labels(method=method, route=route_path, status=status).inc()